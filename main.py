@@ -4,7 +4,7 @@ import sys
 from pathlib import Path
 from typing import List, Tuple, Dict
 
-from PySide6.QtCore import Qt, QSize, QObject, Signal, QThread
+from PySide6.QtCore import Qt, QSize, QObject, QRunnable, QThreadPool, Signal, QThread
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -24,11 +24,11 @@ from PySide6.QtWidgets import (
     QComboBox,
 )
 
-from widgets.image_view import ImageGridView
+from widgets.image_view import ImageGridView, list_images
 from services.renamer import (
     compute_number_width,
     generate_preview_mappings,
-    has_preview_conflicts,
+    plan_rename_operations,
     two_phase_rename,
 )
 
@@ -37,12 +37,19 @@ class RenameWorker(QObject):
     progress_changed = Signal(int, int)  # current, total
     finished = Signal(dict)  # summary
 
-    def __init__(self, mappings: List[Tuple[Path, Path]]):
+    def __init__(
+        self,
+        mappings: List[Tuple[Path, Path]],
+        existing_names_lower: set | None = None,
+    ):
         super().__init__()
         self._mappings = mappings
+        self._existing_names_lower = existing_names_lower
 
     def run(self) -> None:
-        total_ops = len(self._mappings) * 2  # A阶段+B阶段
+        # 无环条目一次改名，仅环上条目需要 A+B 两阶段
+        direct, cyclic = plan_rename_operations(self._mappings)
+        total_ops = len(direct) + len(cyclic) * 2
         completed_ops = 0
 
         def cb() -> None:
@@ -50,7 +57,11 @@ class RenameWorker(QObject):
             completed_ops += 1
             self._emit_progress(total_ops, completed_ops)
 
-        results = two_phase_rename(self._mappings, progress_callback=cb)
+        results = two_phase_rename(
+            self._mappings,
+            existing_names_lower=self._existing_names_lower,
+            progress_callback=cb,
+        )
 
         # 汇总
         success_count = sum(1 for r in results if r[2] is True)
@@ -69,6 +80,57 @@ class RenameWorker(QObject):
         self.progress_changed.emit(completed_ops, total_ops)
 
 
+class DirectoryScanner(QRunnable):
+    """在线程池中枚举目录，避免网络盘/大目录阻塞 GUI 线程。"""
+
+    class Signals(QObject):
+        scanned = Signal(Path, list, set)  # directory, files, names_lower
+
+    def __init__(self, directory: Path) -> None:
+        super().__init__()
+        self.setAutoDelete(True)
+        self.signals = DirectoryScanner.Signals()
+        self._directory = directory
+
+    def run(self) -> None:
+        files, names_lower = list_images(self._directory)
+        self.signals.scanned.emit(self._directory, files, names_lower)
+
+
+class PreviewWorker(QRunnable):
+    """在线程池中生成预览映射，结果回 GUI 线程填表。"""
+
+    class Signals(QObject):
+        generated = Signal(Path, list, bool)  # directory, rows, has_conflict
+
+    def __init__(
+        self,
+        directory: Path,
+        files: List[Path],
+        prefix: str,
+        width: int,
+        existing_names_lower: set,
+    ) -> None:
+        super().__init__()
+        self.setAutoDelete(True)
+        self.signals = PreviewWorker.Signals()
+        self._directory = directory
+        self._files = files
+        self._prefix = prefix
+        self._width = width
+        self._existing = existing_names_lower
+
+    def run(self) -> None:
+        rows, has_conflict = generate_preview_mappings(
+            self._directory,
+            self._files,
+            self._prefix,
+            self._width,
+            existing_names_lower=self._existing,
+        )
+        self.signals.generated.emit(self._directory, rows, has_conflict)
+
+
 class MainWindow(QMainWindow):
     def __init__(self) -> None:
         super().__init__()
@@ -154,6 +216,9 @@ class MainWindow(QMainWindow):
         self._has_conflict: bool = False
         self._rename_thread: QThread | None = None
         self._rename_worker: RenameWorker | None = None
+        # 持有在途的线程池任务，保证其信号对象在结果送达前不被回收
+        self._scanner: DirectoryScanner | None = None
+        self._preview_worker: PreviewWorker | None = None
         self._set_actions_enabled(True)
         self._update_buttons_state()
 
@@ -183,14 +248,24 @@ class MainWindow(QMainWindow):
     def _load_directory(self, path: Path) -> None:
         self._current_dir = path
         self.path_display.setText(str(path))
-        self.statusBar().showMessage("正在加载目录…", 2000)
-        self.image_view.load_directory(path)
+        self.statusBar().showMessage("正在加载目录…")
+        # 目录枚举放入线程池，扫描完成后回 GUI 线程填充视图
+        self._scanner = DirectoryScanner(path)
+        self._scanner.signals.scanned.connect(self._on_directory_scanned)
+        QThreadPool.globalInstance().start(self._scanner)
+
+    def _on_directory_scanned(self, directory: Path, files: List[Path], names_lower: set) -> None:
+        if directory != self._current_dir:
+            return  # 扫描期间用户已切换目录，丢弃过期结果
+        self._scanner = None
+        self.image_view.show_files(directory, files, names_lower)
         # 清空预览
         self._current_preview = []
         self._has_conflict = False
         self.preview_table.setRowCount(0)
         self._update_buttons_state()
         self._update_width_options()
+        self.statusBar().showMessage("目录加载完成", 2000)
 
     def _generate_preview(self) -> None:
         if not self._current_dir:
@@ -202,14 +277,36 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "提示", "当前目录无图片文件")
             return
         self._update_width_options()
-        mappings = generate_preview_mappings(
+        # 预览生成放入线程池，大目录下不再卡住点击
+        self.btn_preview.setEnabled(False)
+        self._preview_worker = PreviewWorker(
             self._current_dir,
             files,
             prefix,
             self._selected_width(),
+            self.image_view.existing_names_lower(),
         )
-        self._current_preview = [(m.old_path, m.new_path, m.status) for m in mappings]
-        self._has_conflict = has_preview_conflicts(mappings)
+        self._preview_worker.signals.generated.connect(self._on_preview_generated)
+        QThreadPool.globalInstance().start(self._preview_worker)
+
+    def _on_preview_generated(self, directory: Path, rows: list, has_conflict: bool) -> None:
+        self._preview_worker = None
+        self.btn_preview.setEnabled(True)
+        # 用户已切换目录：迟到的预览结果直接丢弃（与 _on_directory_scanned 一致），
+        # 否则旧目录的映射会被填表并解锁执行按钮
+        if directory != self._current_dir:
+            return
+        # rows 已是 (old, new, status) 三元组，直接使用
+        self._current_preview = rows
+        self._has_conflict = has_conflict
+        # 全部文件名已就位：跳过填表，直接提示无需修改
+        if not self._has_conflict and all(
+            old_p.name == new_p.name for old_p, new_p, _ in self._current_preview
+        ):
+            self.preview_table.setRowCount(0)
+            self._update_buttons_state()
+            self.statusBar().showMessage("无需修改：文件名已符合目标格式", 3000)
+            return
         self._fill_preview_table(self._current_preview)
         self._update_buttons_state()
         if self._has_conflict:
@@ -294,12 +391,17 @@ class MainWindow(QMainWindow):
 
         self._set_actions_enabled(False)
         self.progress.setVisible(True)
-        self.progress.setRange(0, len(mappings) * 2)
+        # 初始量程与 RenameWorker 的计数口径一致（direct 一次、环上成员两次），
+        # 否则批量提交路径上 tick 迟到时进度条会长期停在错误的总数上
+        direct, cyclic = plan_rename_operations(mappings)
+        self.progress.setRange(0, len(direct) + len(cyclic) * 2)
         self.progress.setValue(0)
 
         # 线程执行
         self._rename_thread = QThread(self)
-        self._rename_worker = RenameWorker(mappings)
+        self._rename_worker = RenameWorker(
+            mappings, self.image_view.existing_names_lower()
+        )
         self._rename_worker.moveToThread(self._rename_thread)
         self._rename_thread.started.connect(self._rename_worker.run)
         self._rename_worker.progress_changed.connect(self._on_rename_progress)
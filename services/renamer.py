@@ -1,20 +1,38 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Callable, Dict, Iterable, List, Tuple
-import uuid
+from typing import Callable, Dict, List, Tuple
+import os
+import random
+import re
+import sys
 import time
 import errno
 
 
-ILLEGAL_CHARS = set('/\\:*?"<>|')  # Windows 非法字符
+ILLEGAL_CHARS = frozenset('/\\:*?"<>|')  # Windows 非法字符
+
+# translate 删除表：删掉全部非法字符后长度不变 ⇔ 名称合法（C 层单次扫描）
+_ILLEGAL_TRANS = str.maketrans("", "", '/\\:*?"<>|')
+
+# 临时名后缀的随机源：48 位随机数对一个批次内的唯一性绰绰有余，
+# 且比完整 uuid4 少 ~24 个字符，降低触发 MAX_PATH 限制的风险
+_tmp_rng = random.Random()
+_tmp_rng.seed(os.urandom(16))
+
+
+def _temp_name(old: Path) -> Path:
+    return old.with_name(f"{old.stem}.__tmp__{_tmp_rng.getrandbits(48):012x}{old.suffix}")
+
+
+_NATKEY_RE = re.compile(r"(\d+)")  # 模块级预编译，免去每次调用的缓存查找
 
 
 def natural_key(s: str) -> List[object]:
     # 预留自然排序函数（默认不用）
-    import re
-    return [int(text) if text.isdigit() else text.lower() for text in re.split(r"(\d+)", s)]
+    return [int(t) if t.isdigit() else t.casefold() for t in _NATKEY_RE.split(s)]
 
 
 def compute_number_width(total_images: int, override: int | None = None) -> int:
@@ -25,14 +43,7 @@ def compute_number_width(total_images: int, override: int | None = None) -> int:
 
 
 def _has_illegal_chars(name: str) -> bool:
-    return any(ch in ILLEGAL_CHARS for ch in name)
-
-
-@dataclass
-class PreviewRow:
-    old_path: Path
-    new_path: Path
-    status: str  # "OK" | 错误说明
+    return len(name.translate(_ILLEGAL_TRANS)) != len(name)
 
 
 def generate_preview_mappings(
@@ -40,109 +51,403 @@ def generate_preview_mappings(
     files: List[Path],
     prefix: str,
     width_override: int | None = None,
-) -> List[PreviewRow]:
+    existing_names_lower: set[str] | None = None,
+) -> Tuple[List[Tuple[Path, Path, str]], bool]:
+    # 返回 (rows, has_conflict)：rows 为 (old_path, new_path, status) 三元组，
+    # 冲突标志在生成时顺带算出，调用方无需再整体扫一遍。
     # files 已按文件名升序
+    # existing_names_lower: 调用方（如 ImageGridView）刚扫描过目录时可直接传入，
+    # 避免重复扫描；为 None 时自行扫描一次。
     width = compute_number_width(len(files), width_override)
-    rows: List[PreviewRow] = []
+    rows: List[Tuple[Path, Path, str]] = []
+    has_conflict = False
     # 构建现有目标名集合（大小写不敏感的文件系统注意：Windows 默认不区分大小写）
-    existing_lower = {p.name.lower() for p in directory.iterdir() if p.is_file()}
-
-    new_names_counter: Dict[str, int] = {}
+    if existing_names_lower is not None:
+        existing_lower = existing_names_lower
+    else:
+        # DirEntry.is_file() 复用枚举时已取得的属性，不再每项多发一次 stat
+        with os.scandir(directory) as it:
+            existing_lower = {e.name.lower() for e in it if e.is_file()}
+
+    # 预构造格式串：编号零填充由 format 一次完成，免去每项 zfill 临时串
+    name_fmt = f"{prefix}{{:0{width}d}}{{}}"
+    new_names_lower: List[str] = []
+    checked_idx: List[int] = []  # 与 new_names_lower 对齐（不含原名即目标名的项）
 
     for idx, old in enumerate(files, start=1):
-        ext = old.suffix  # 保留原扩展
-        number = str(idx).zfill(width)
-        new_name = f"{prefix}{number}{ext}"
+        new_name = name_fmt.format(idx, old.suffix)  # 保留原扩展
+        if new_name == old.name:
+            # 名称已就位：不构造新 Path、不进非法/重复/冲突检测
+            rows.append((old, old, "OK"))
+            continue
         status = "OK"
 
-        # 非法字符（仅主文件名，不含扩展）
-        if _has_illegal_chars(Path(new_name).stem):
+        # 非法字符（仅主文件名，不含扩展；rpartition 免去 Path 临时对象）
+        stem = new_name.rpartition(".")[0] or new_name
+        if _has_illegal_chars(stem):
             status = "非法名称"
 
-        # 新名重复检测（在生成的清单中）
         low = new_name.lower()
-        new_names_counter[low] = new_names_counter.get(low, 0) + 1
-        if new_names_counter[low] > 1:
-            status = "新名重复"
+        new_names_lower.append(low)
 
         # 与现有文件冲突（若最终新名与旧名相同则不算冲突）
         if old.name.lower() != low and low in existing_lower:
             status = "与现有文件冲突"
 
-        rows.append(PreviewRow(old_path=old, new_path=directory / new_name, status=status))
+        if status != "OK":
+            has_conflict = True
+        rows.append((old, directory / new_name, status))
+        checked_idx.append(len(rows) - 1)
+
+    # 新名重复检测（在生成的清单中）：一次 Counter + 一趟快速标记
+    counts = Counter(new_names_lower)
+    if len(counts) != len(new_names_lower):
+        for i, low in zip(checked_idx, new_names_lower):
+            old_p, new_p, status = rows[i]
+            if counts[low] > 1 and status != "与现有文件冲突":
+                rows[i] = (old_p, new_p, "新名重复")
+                has_conflict = True
 
-    return rows
+    return rows, has_conflict
 
 
-def has_preview_conflicts(rows: Iterable[PreviewRow]) -> bool:
-    return any(r.status != "OK" for r in rows)
+def plan_rename_operations(
+    mappings: List[Tuple[Path, Path]],
+) -> Tuple[List[Tuple[Path, Path]], List[Tuple[Path, Path]]]:
+    """
+    把重命名映射拆分为 (direct, cyclic) 两组：
+    - direct: 新名不占用清单内其他文件的旧名（或依赖链无环），可按返回顺序
+      直接 old→new 一次改名；顺序已按依赖拓扑排好（被占用名先释放）。
+    - cyclic: 新旧名构成环（如 a↔b 互换），必须经过临时名两阶段改名。
+    常见的"加前缀"场景里新旧名集合不相交，全部落在 direct，
+    系统调用与进度计数减半。
+    """
+    old_index = {old.name.lower(): i for i, (old, _) in enumerate(mappings)}
+    # 函数图：每个节点至多一条出边 i→j，表示 i 的新名是 j 的旧名（j 须先改走）
+    out_edge: Dict[int, int] = {}
+    for i, (_, new) in enumerate(mappings):
+        j = old_index.get(new.name.lower())
+        if j is not None and j != i:
+            out_edge[i] = j
+
+    # 染色遍历找环：0=未访问 1=当前链上 2=已完成
+    color = [0] * len(mappings)
+    on_cycle: set[int] = set()
+    order: List[int] = []  # 直接改名的拓扑序（链尾先改）
+    for start in range(len(mappings)):
+        if color[start]:
+            continue
+        chain: List[int] = []
+        i: int | None = start
+        while i is not None and color[i] == 0:
+            color[i] = 1
+            chain.append(i)
+            i = out_edge.get(i)
+        if i is not None and color[i] == 1:
+            # 链尾绕回到当前链：从 i 开始的尾段构成环
+            on_cycle.update(chain[chain.index(i):])
+        for i in reversed(chain):
+            color[i] = 2
+            if i not in on_cycle:
+                order.append(i)
+
+    direct = [mappings[i] for i in order]
+    cyclic = [mappings[i] for i in sorted(on_cycle)]
+    return direct, cyclic
 
 
 def two_phase_rename(
     mappings: List[Tuple[Path, Path]],
+    existing_names_lower: set[str] | None = None,
     progress_callback: Callable[[], None] | None = None,
 ) -> List[Tuple[Path, Path, bool, str | None]]:
     """
     执行两阶段重命名。返回 (old, new, success, error_message)。
     仅处理需要更名的条目（调用方应已过滤）。
-    progress_callback: 每完成一个阶段操作回调一次。
+    无环依赖的条目直接一次改名；只有新旧名构成环的条目才经过临时名。
+    existing_names_lower: 目录当前文件名集合（小写）。提供时作为内存中的
+    文件系统镜像使用——占用检查查集合而非 stat，且随每次成功改名增量更新。
+    progress_callback: 每完成一个阶段操作回调一次
+    （总操作数 = len(direct) + 2*len(cyclic)，见 plan_rename_operations）。
     """
-    # 阶段 A：改为唯一临时名
-    temp_map: Dict[Path, Path] = {}
+    direct, cyclic = plan_rename_operations(mappings)
+    existing = existing_names_lower
+
+    # Windows 下优先走 Shell IFileOperation 批量提交（单次内核侧事务 + 外壳撤销）
+    if sys.platform == "win32":
+        batch_results = _batch_rename_win(direct, cyclic, progress_callback)
+        if batch_results is not None:
+            return batch_results
+
     results: List[Tuple[Path, Path, bool, str | None]] = []
-    errors: Dict[Path, str] = {}
 
     def tick() -> None:
         if progress_callback:
             progress_callback()
 
-    for old, new in mappings:
+    # 并发策略：改名是系统调用密集型，本地盘上并发到 4~8 线程近线性提速；
+    # 小批量线程池开销不划算，UNC 网络路径上并发反而易退化，均退回串行
+    use_parallel = (
+        len(mappings) >= 8
+        and (os.cpu_count() or 1) > 1
+        and not str(mappings[0][0].parent).startswith("\\\\")
+    )
+    max_workers = min(8, os.cpu_count() or 1)
+
+    def _run_batch(items, worker, on_ok, on_err):
+        # worker 在线程池（或当前线程）执行，只做改名；
+        # on_ok/on_err（结果收集、镜像集合更新、tick）统一在协调线程执行
+        if use_parallel and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(worker, item): item for item in items}
+                for future in as_completed(futures):
+                    item = futures[future]
+                    try:
+                        on_ok(item, future.result())
+                    except Exception as e:  # noqa: BLE001
+                        on_err(item, e)
+                    tick()
+        else:
+            for item in items:
+                try:
+                    on_ok(item, worker(item))
+                except Exception as e:  # noqa: BLE001
+                    on_err(item, e)
+                tick()
+
+    # 阶段 A（仅环上成员）：改为唯一临时名，释放环内被占用的旧名
+    temp_entries: List[Tuple[Path, Path, Path]] = []  # (temp, old, target)
+
+    def _phase_a_worker(pair: Tuple[Path, Path]) -> Path:
+        temp = _temp_name(pair[0])
+        _rename_with_retry(pair[0], temp)
+        return temp
+
+    def _phase_a_ok(pair: Tuple[Path, Path], temp: Path) -> None:
+        old, new = pair
+        temp_entries.append((temp, old, new))
+        if existing is not None:
+            existing.discard(old.name.lower())
+            existing.add(temp.name.lower())
+
+    def _phase_a_err(pair: Tuple[Path, Path], e: Exception) -> None:
+        results.append((pair[0], pair[1], False, f"阶段A失败: {e}"))
+
+    _run_batch(cyclic, _phase_a_worker, _phase_a_ok, _phase_a_err)
+
+    # 无环条目：目标名不占用批内旧名的可乱序并发；链上条目按拓扑序串行
+    # （占用检查查内存镜像集合，不 stat；无集合时靠 rename 自身报错）
+    batch_old_names = {old.name.lower() for old, _ in mappings}
+    independent = [(o, n) for o, n in direct if n.name.lower() not in batch_old_names]
+    chained = [(o, n) for o, n in direct if n.name.lower() in batch_old_names]
+
+    def _direct_worker(pair: Tuple[Path, Path]) -> None:
+        old, new = pair
+        # 纯大小写改名时目标小写名就是自己的旧名，镜像集合必然命中，放行
+        if (
+            existing is not None
+            and new.name.lower() != old.name.lower()
+            and new.name.lower() in existing
+        ):
+            raise OSError("目标已存在")
+        _rename_with_retry(old, new)
+
+    def _direct_ok(pair: Tuple[Path, Path], _result: None) -> None:
+        old, new = pair
+        if existing is not None:
+            existing.discard(old.name.lower())
+            existing.add(new.name.lower())
+        results.append((new, new, True, None))
+
+    def _direct_err(pair: Tuple[Path, Path], e: Exception) -> None:
+        results.append((pair[0], pair[1], False, f"重命名失败: {e}"))
+
+    _run_batch(independent, _direct_worker, _direct_ok, _direct_err)
+    for pair in chained:
         try:
-            temp = old.with_name(f"{old.stem}.__tmp__{uuid.uuid4().hex}{old.suffix}")
-            _rename_with_retry(old, temp)
-            temp_map[temp] = new
-            tick()
-        except Exception as e:
-            errors[old] = f"阶段A失败: {e}"
-            results.append((old, new, False, errors[old]))
-            tick()  # 仍然推进一次以匹配总进度
-
-    # 阶段 B：从临时名改为目标名
-    for temp, target in list(temp_map.items()):
-        # 如果该条在阶段A已失败则跳过
-        # 但这里 temp_map 仅包含A成功的项
+            _direct_worker(pair)
+            _direct_ok(pair, None)
+        except Exception as e:  # noqa: BLE001
+            _direct_err(pair, e)
+        tick()
+
+    # 阶段 B：从临时名改为目标名（目标名在阶段A后均已释放，可并发）
+    def _phase_b_worker(entry: Tuple[Path, Path, Path]) -> None:
+        temp, old, target = entry
+        # 同上：目标与原名仅大小写不同时不算占用
+        if (
+            existing is not None
+            and target.name.lower() != old.name.lower()
+            and target.name.lower() in existing
+        ):
+            raise OSError("目标已存在")
+        _rename_with_retry(temp, target)
+
+    def _phase_b_ok(entry: Tuple[Path, Path, Path], _result: None) -> None:
+        temp, _, target = entry
+        if existing is not None:
+            existing.discard(temp.name.lower())
+            existing.add(target.name.lower())
+        results.append((target, target, True, None))
+
+    def _phase_b_err(entry: Tuple[Path, Path, Path], e: Exception) -> None:
+        temp, old, target = entry
+        # 尝试回滚：把临时名改回原名（最佳努力）
         try:
-            # 再次检查目标是否被占用
-            if target.exists():
-                raise OSError("目标已存在")
-            _rename_with_retry(temp, target)
-            results.append((target, target, True, None))
-            tick()
-        except Exception as e:
-            # 尝试回滚：把临时名改回原名（最佳努力）
-            origin = target.with_name(target.stem.split(".__tmp__")[0] + target.suffix)
+            if not old.exists():
+                _rename_with_retry(temp, old)
+                if existing is not None:
+                    existing.discard(temp.name.lower())
+                    existing.add(old.name.lower())
+        except Exception:
+            pass
+        results.append((old, target, False, f"阶段B失败: {e}"))
+
+    _run_batch(temp_entries, _phase_b_worker, _phase_b_ok, _phase_b_err)
+
+    return results
+
+
+def _batch_rename_win(
+    direct: List[Tuple[Path, Path]],
+    cyclic: List[Tuple[Path, Path]],
+    progress_callback: Callable[[], None] | None = None,
+) -> List[Tuple[Path, Path, bool, str | None]] | None:
+    """
+    通过 Windows Shell 的 IFileOperation 接口批量提交重命名。
+    第一批 = 全部直接改名 + 环上成员的阶段A临时名，第二批 = 环上成员的
+    阶段B目标名；N 次 MoveFileExW 系统调用被合并为每批一次
+    PerformOperations() 的内核侧批处理，同时获得资源管理器级别的撤销支持。
+    pywin32 不可用（或 COM 初始化失败）时返回 None，由调用方回退到
+    纯 Python 的逐文件路径（POSIX 下始终走回退路径）。
+    """
+    try:
+        import pythoncom  # type: ignore[import-not-found]
+        from win32com.shell import shell  # type: ignore[import-not-found]
+    except ImportError:
+        return None
+
+    def tick(n: int = 1) -> None:
+        if progress_callback:
+            for _ in range(n):
+                progress_callback()
+
+    # FOF_NO_UI = FOF_SILENT|FOF_NOCONFIRMATION|FOF_NOERRORUI|FOF_NOCONFIRMMKDIR
+    FOF_NO_UI = 0x0004 | 0x0010 | 0x0400 | 0x0200
+    FOFX_NOCOPYHOOKS = 0x00000400
+
+    def _build(pairs: List[Tuple[Path, str]]):
+        # 组装一批 RenameItem；此处尚未对文件系统做任何更改
+        op = pythoncom.CoCreateInstance(
+            shell.CLSID_FileOperation,
+            None,
+            pythoncom.CLSCTX_ALL,
+            shell.IID_IFileOperation,
+        )
+        op.SetOperationFlags(FOF_NO_UI | FOFX_NOCOPYHOOKS)
+        for src, new_name in pairs:
+            item = shell.SHCreateItemFromParsingName(str(src), None, shell.IID_IShellItem)
+            op.RenameItem(item, new_name, None)
+        return op
+
+    def _execute(op) -> None:
+        # PerformOperations 非事务性：一旦调用即可能产生部分更改，
+        # 此后不得再回退到纯 Python 路径重跑同一批映射
+        op.PerformOperations()
+        if op.GetAnyOperationsAborted():
+            raise OSError("部分操作被系统中止")
+
+    results: List[Tuple[Path, Path, bool, str | None]] = []
+    temp_pairs: List[Tuple[Path, Path]] = []  # (temp, target)
+    # 调用方（RenameWorker）跑在每次新建的 QThread 上，COM 必须在
+    # 本线程初始化，否则 CoCreateInstance 报 CO_E_NOTINITIALIZED
+    pythoncom.CoInitialize()
+    try:
+        # 第一批：直接改名 + 环上成员改为唯一临时名，单次提交
+        batch_one: List[Tuple[Path, str]] = [(old, new.name) for old, new in direct]
+        for old, new in cyclic:
+            temp = _temp_name(old)
+            batch_one.append((old, temp.name))
+            temp_pairs.append((temp, new))
+        try:
+            batch_op = _build(batch_one)
+        except Exception:  # noqa: BLE001
+            # COM 环境异常（如接口不受支持）：未产生任何更改，回退纯 Python 路径
+            return None
+        try:
+            _execute(batch_op)
+        except Exception as e:  # noqa: BLE001
+            # 第一批提交失败：可能已部分生效，按整批失败上报（不回退）
+            for old, new in direct:
+                results.append((old, new, False, f"重命名失败: {e}"))
+            for old, new in cyclic:
+                results.append((old, new, False, f"阶段A失败: {e}"))
+            tick(len(direct) + len(cyclic) * 2)
+            return results
+        tick(len(batch_one))
+        for _, new in direct:
+            results.append((new, new, True, None))
+
+        if not temp_pairs:
+            return results
+
+        try:
+            # 第二批：环上成员从临时名改为目标名
+            _execute(_build([(temp, target.name) for temp, target in temp_pairs]))
+            tick(len(temp_pairs))
+            for _, target in temp_pairs:
+                results.append((target, target, True, None))
+            return results
+        except Exception as e:  # noqa: BLE001
+            # 尝试回滚：把临时名批量改回原名（最佳努力）
             try:
-                if not origin.exists():
-                    _rename_with_retry(temp, origin)
+                _execute(
+                    _build(
+                        [
+                            (temp, old.name)
+                            for (old, _), (temp, _) in zip(cyclic, temp_pairs)
+                        ]
+                    )
+                )
             except Exception:
                 pass
-            results.append((origin, target, False, f"阶段B失败: {e}"))
-            tick()
+            tick(len(temp_pairs))
+            for (old, _), (_, target) in zip(cyclic, temp_pairs):
+                results.append((old, target, False, f"阶段B失败: {e}"))
+            return results
+    finally:
+        pythoncom.CoUninitialize()
 
-    return results
 
+def _rename_with_retry(src: Path, dst: Path, retries: int = 4, base_delay: float = 0.05) -> None:
+    """在 Windows 上对占用错误进行退避重试。
 
-def _rename_with_retry(src: Path, dst: Path, retries: int = 8, base_delay: float = 0.05) -> None:
-    """在 Windows 上对占用错误进行指数退避重试。"""
+    退避间隔封顶 0.25s、总等待约 0.6s：重试发生在持有 QThread 的
+    工作线程里，长时间 sleep 会卡住整批进度上报。
+    """
+    src_s, dst_s = str(src), str(dst)
+    # Windows 的 os.rename 在目标已存在时报 ERROR_ALREADY_EXISTS；
+    # POSIX rename 会静默覆盖目标，这里先显式拒绝（同一文件的大小写
+    # 改名在不区分大小写的文件系统上会命中 exists，用 samefile 放行）
+    if sys.platform != "win32" and os.path.lexists(dst_s):
+        try:
+            same = os.path.samefile(src_s, dst_s)
+        except OSError:
+            same = False
+        if not same:
+            raise OSError("目标已存在")
     last_exc: Exception | None = None
     for attempt in range(retries):
         try:
-            src.rename(dst)
+            os.rename(src_s, dst_s)
             return
         except Exception as e:  # noqa: BLE001
             last_exc = e
-            # 判定是否为可重试的临时性错误
             winerr = getattr(e, "winerror", None)
+            # 目标已存在（Windows 下 183=ERROR_ALREADY_EXISTS）：重试无意义，立即报错
+            if isinstance(e, FileExistsError) or winerr == 183:
+                raise OSError("目标已存在") from e
+            # 判定是否为可重试的临时性错误
             err_no = getattr(e, "errno", None)
             msg = str(e).lower()
             transient = (
@@ -152,7 +457,7 @@ def _rename_with_retry(src: Path, dst: Path, retries: int = 8, base_delay: float
                 or ("used by another process" in msg or "being used" in msg)
             )
             if attempt < retries - 1 and transient:
-                time.sleep(base_delay * (2 ** attempt))
+                time.sleep(min(base_delay * (1.5 ** attempt), 0.25))
                 continue
             raise
     if last_exc:
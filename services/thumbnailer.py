@@ -1,11 +1,36 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
+import itertools
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
-from PySide6.QtCore import QObject, Signal, QSize, QThreadPool, QRunnable, Qt
-from PySide6.QtGui import QImageReader, QPixmap, QImage
+from PySide6.QtCore import (
+    QObject,
+    Signal,
+    QSize,
+    QThread,
+    Qt,
+    QBuffer,
+    QCoreApplication,
+    QIODevice,
+    QStandardPaths,
+)
+from PySide6.QtGui import QImageReader, QImage
+
+try:
+    # 可选加速：Pillow（或 pillow-simd）的 JPEG 解码在 C 层释放 GIL，
+    # 且 draft() 让 libjpeg 在解码期做 1/N 缩放
+    from PIL import Image as _PILImage, ImageOps as _PILImageOps
+except ImportError:
+    _PILImage = None
+    _PILImageOps = None
 
 
 @dataclass
@@ -13,63 +38,306 @@ class _Task:
     path: Path
     size: QSize
     generation: int
+    mtime_ns: int = 0
+    row: int = 0  # 在视图中的行号，用于按可视区距离排程
+
+
+def _decode_jpeg_pil(task: _Task) -> QImage:
+    """Pillow 路径：draft 解码期缩放 + 释放 GIL 的 SIMD 重采样。"""
+    max_w, max_h = task.size.width(), task.size.height()
+    with _PILImage.open(task.path) as im:
+        # draft 让 libjpeg 以 1/2、1/4、1/8 比例在 IDCT 阶段缩放
+        im.draft("RGB", (max_w * 8, max_h * 8))
+        resample = getattr(_PILImage, "Resampling", _PILImage).BILINEAR
+        im.thumbnail((max_w, max_h), resample)
+        # EXIF 方向校正放在缩略图之后，只转小图
+        im = _PILImageOps.exif_transpose(im)
+        if im.mode != "RGB":
+            im = im.convert("RGB")
+        data = im.tobytes("raw", "RGB")
+        qimg = QImage(
+            data, im.width, im.height, im.width * 3, QImage.Format_RGB888
+        ).copy()
+    return _to_native_format(qimg)
+
+
+def _decode_thumbnail(task: _Task) -> QImage | None:
+    """解码并缩放单张缩略图；失败返回 None。"""
+    if _PILImage is not None and task.path.suffix.lower() in (".jpg", ".jpeg"):
+        try:
+            return _decode_jpeg_pil(task)
+        except Exception:
+            pass  # 回退 QImageReader 路径
+    reader = QImageReader(str(task.path))
+    reader.setAutoTransform(True)
+    max_w, max_h = task.size.width(), task.size.height()
+    native = reader.size()
+    if not native.isEmpty():
+        # 在解码阶段缩放：JPEG 走 libjpeg 的 1/N IDCT 缩放，
+        # 避免先解出全分辨率图再缩小
+        if bytes(reader.format()).lower() in (b"jpg", b"jpeg"):
+            reader.setQuality(25)  # 选择快速 IDCT 路径
+        reader.setScaledSize(native.scaled(max_w, max_h, Qt.KeepAspectRatio))
+        img: QImage = reader.read()
+        if img.isNull():
+            return None
+    else:
+        # 格式未提供原始尺寸，退回读取后缩放
+        img = reader.read()
+        if img.isNull():
+            return None
+        # 使用位置参数，兼容不同 PySide6 版本的关键字
+        img = img.scaled(max_w, max_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return _to_native_format(img)
+
 
+def _to_native_format(img: QImage) -> QImage:
+    # 预转为 QPixmap 内部使用的格式，GUI 线程 fromImage 零转换；
+    # QPixmap 本身在部分平台后端上不允许在非 GUI 线程创建
+    target_format = (
+        QImage.Format_ARGB32_Premultiplied if img.hasAlphaChannel() else QImage.Format_RGB32
+    )
+    if img.format() != target_format:
+        img = img.convertToFormat(target_format)
+    return img
 
-class _ThumbRunnable(QRunnable):
-    def __init__(self, task: _Task, emitter: "ThumbnailerService") -> None:
+
+def _disk_writer_loop(db_path: str, write_queue: "queue.SimpleQueue") -> None:
+    """磁盘缓存的唯一写入线程：SQLite 连接保持单线程使用。"""
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+    except Exception:
+        return
+    while True:
+        entry = write_queue.get()
+        if entry is None:
+            break
+        try:
+            conn.execute("INSERT OR REPLACE INTO thumbs(key, png) VALUES(?, ?)", entry)
+            conn.commit()
+        except Exception:
+            # 磁盘缓存写失败不影响正常显示
+            pass
+    conn.close()
+
+
+class _ThumbWorker(QThread):
+    """常驻工作线程：循环从服务队列取任务，哨兵 None 表示退出。"""
+
+    def __init__(self, service: "ThumbnailerService") -> None:
         super().__init__()
-        self._task = task
-        self._emitter = emitter
+        self._service = service
 
     def run(self) -> None:
-        try:
-            # 加载并缩放
-            reader = QImageReader(str(self._task.path))
-            reader.setAutoTransform(True)
-            img: QImage = reader.read()
-            if img.isNull():
+        while True:
+            _, _, task = self._service._queue.get()
+            if task is None:
                 return
-            max_w, max_h = self._task.size.width(), self._task.size.height()
-            # 使用位置参数，兼容不同 PySide6 版本的关键字
-            img = img.scaled(max_w, max_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            px = QPixmap.fromImage(img)
-            # 缓存检查在发射前由服务完成
-            self._emitter._on_worker_ready(self._task, px)
-        except Exception:
-            # 忽略单个缩略图失败，避免刷屏报错
-            return
+            # 在解码前检查代次：被取消的任务不再浪费一次完整解码
+            if task.generation != self._service._generation:
+                continue
+            try:
+                image = _decode_thumbnail(task)
+            except Exception:
+                # 忽略单个缩略图失败，避免刷屏报错
+                continue
+            if image is not None:
+                self._service._on_worker_ready(task, image)
 
 
 class ThumbnailerService(QObject):
-    thumbnail_ready = Signal(Path, QPixmap, int)  # path, pixmap, generation
+    thumbnail_ready = Signal(Path, QImage, int)  # path, image, generation
 
     def __init__(self) -> None:
         super().__init__()
-        self._pool = QThreadPool.globalInstance()
-        self._cache: Dict[Tuple[Path, Tuple[int, int]], QPixmap] = {}
+        # LRU 缓存：键含 mtime_ns，重命名/覆盖文件后旧项自动失效；
+        # 按像素字节数预算上限淘汰，避免长会话无限增长。
+        # 多个常驻工作线程与 GUI 线程并发读写，字典与字节计数统一加锁
+        self._cache: OrderedDict[Tuple[Path, int, int, int], QImage] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_bytes = 0
+        self._cache_limit = 128 << 20  # 128 MB
+        self._mtime_cache: Dict[Path, int] = {}
         self._generation = 0
+        # 常驻工作线程 + 共享优先队列：避免为每张图分配一个 QRunnable 并入池，
+        # 并把并发度压到 idealThreadCount-1 以保持 UI 响应。
+        # 队列元素为 (priority, seq, task)：priority 为与可视区的行距，
+        # seq 单调递增做稳定排序兜底；task 为 None 表示退出哨兵
+        self._queue: "queue.PriorityQueue[Tuple[int, int, _Task | None]]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        worker_count = max(2, QThread.idealThreadCount() - 1)
+        self._workers: List[_ThumbWorker] = [_ThumbWorker(self) for _ in range(worker_count)]
+        for worker in self._workers:
+            worker.start()
+        # 磁盘缓存：跨会话复用缩略图，冷启动同一目录免全部重解码。
+        # 读在 GUI 线程（WAL 下与写并发安全），写集中在单独线程保持 SQLite 单线程
+        self._db: sqlite3.Connection | None = None
+        self._disk_queue: "queue.SimpleQueue[Tuple[str, bytes] | None]" = queue.SimpleQueue()
+        self._init_disk_cache()
+        # 退出前显式收线程：QThread 在仍运行时被析构会直接 abort 进程。
+        # 正常路径走 aboutToQuit；atexit 兜底没有事件循环的用法
+        # （__del__ 因 worker↔service 引用环要到解释器清场才触发，已太迟）
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+        atexit.register(self.shutdown)
+
+    def _init_disk_cache(self) -> None:
+        try:
+            cache_dir = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+            if not cache_dir:
+                return
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            db_path = str(Path(cache_dir) / "thumbs.db")
+            conn = sqlite3.connect(db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS thumbs (key TEXT PRIMARY KEY, png BLOB)")
+            conn.commit()
+        except Exception:
+            # 无法建立磁盘缓存时静默退化为纯内存缓存
+            return
+        self._db = conn
+        writer = threading.Thread(
+            target=_disk_writer_loop, args=(db_path, self._disk_queue), daemon=True
+        )
+        writer.start()
+
+    @staticmethod
+    def _disk_key(path: Path, mtime_ns: int, w: int, h: int) -> str:
+        return hashlib.blake2b(
+            f"{path}|{mtime_ns}|{w}x{h}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+    def shutdown(self) -> None:
+        """投递退出哨兵并等待全部工作线程结束；可重复调用。"""
+        if not self._workers:
+            return
+        # 哨兵优先级最高，确保先于积压任务被取出
+        for _ in self._workers:
+            self._queue.put((-1, next(self._seq), None))
+        for worker in self._workers:
+            worker.wait()
+        self._workers = []
+        self._disk_queue.put(None)
+
+    def __del__(self) -> None:
+        # 兜底：正常退出路径由 aboutToQuit 连接的 shutdown() 负责
+        try:
+            self.shutdown()
+        except Exception:
+            pass
 
     def cancel_pending(self) -> None:
-        # 通过增加代次号让旧任务结果自动丢弃
+        # 排空尚未开始的任务，再通过增加代次号让在途结果自动丢弃
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
         self._generation += 1
+        # 目录内容可能已变化，mtime 记忆随代次作废
+        self._mtime_cache.clear()
 
-    def request_thumbnail(self, path: Path, size: QSize) -> None:
-        key = (path, (size.width(), size.height()))
-        # 命中缓存
-        if key in self._cache:
-            self.thumbnail_ready.emit(path, self._cache[key], self._generation)
+    def _mtime_ns(self, path: Path) -> int:
+        # 同一代次内只对每个路径 stat 一次
+        mtime = self._mtime_cache.get(path)
+        if mtime is None:
+            try:
+                mtime = path.stat().st_mtime_ns
+            except OSError:
+                mtime = 0
+            self._mtime_cache[path] = mtime
+        return mtime
+
+    @staticmethod
+    def _image_bytes(image: QImage) -> int:
+        return image.width() * image.height() * image.depth() // 8
+
+    def request_thumbnail(self, path: Path, size: QSize, row: int = 0) -> None:
+        mtime_ns = self._mtime_ns(path)
+        key = (path, mtime_ns, size.width(), size.height())
+        # 命中内存缓存
+        with self._cache_lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+        if image is not None:
+            self.thumbnail_ready.emit(path, image, self._generation)
             return
-        task = _Task(path=path, size=size, generation=self._generation)
-        runnable = _ThumbRunnable(task, self)
-        self._pool.start(runnable)
+        # 命中磁盘缓存：载入 PNG 即可，省去整张原图解码
+        if self._db is not None:
+            dkey = self._disk_key(path, mtime_ns, size.width(), size.height())
+            try:
+                hit = self._db.execute(
+                    "SELECT png FROM thumbs WHERE key=?", (dkey,)
+                ).fetchone()
+            except Exception:
+                hit = None
+            if hit:
+                image = QImage()
+                if image.loadFromData(hit[0], "PNG"):
+                    image = _to_native_format(image)
+                    self._cache_put(key, image)
+                    self.thumbnail_ready.emit(path, image, self._generation)
+                    return
+        task = _Task(
+            path=path,
+            size=size,
+            generation=self._generation,
+            mtime_ns=mtime_ns,
+            row=row,
+        )
+        # 加载初期以行号为优先级：靠前（可视）的先解码
+        self._queue.put((row, next(self._seq), task))
+
+    def reprioritize(self, visible_row: int) -> None:
+        # 滚动后按"与可视行的距离"重排积压任务，让用户正在看的先解码
+        pending: List[_Task] = []
+        while True:
+            try:
+                _, _, task = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                # 退出哨兵原样放回
+                self._queue.put((-1, next(self._seq), None))
+                continue
+            pending.append(task)
+        for task in pending:
+            self._queue.put((abs(task.row - visible_row), next(self._seq), task))
+
+    def _cache_put(self, key: Tuple[Path, int, int, int], image: QImage) -> None:
+        with self._cache_lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._cache_bytes -= self._image_bytes(old)
+            self._cache[key] = image
+            self._cache_bytes += self._image_bytes(image)
+            # 超出预算时从最久未用端淘汰
+            while self._cache_bytes > self._cache_limit and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= self._image_bytes(evicted)
 
     # 由工作线程回调
-    def _on_worker_ready(self, task: _Task, pixmap: QPixmap) -> None:
+    def _on_worker_ready(self, task: _Task, image: QImage) -> None:
         # generation 过滤
         if task.generation != self._generation:
             return
-        key = (task.path, (task.size.width(), task.size.height()))
-        self._cache[key] = pixmap
-        self.thumbnail_ready.emit(task.path, pixmap, task.generation)
+        key = (task.path, task.mtime_ns, task.size.width(), task.size.height())
+        self._cache_put(key, image)
+        # 序列化为 PNG 入磁盘缓存（仍在工作线程，不占 GUI 时间）
+        if self._db is not None:
+            try:
+                buf = QBuffer()
+                buf.open(QIODevice.WriteOnly)
+                image.save(buf, "PNG")
+                dkey = self._disk_key(
+                    task.path, task.mtime_ns, task.size.width(), task.size.height()
+                )
+                self._disk_queue.put((dkey, bytes(buf.data().data())))
+            except Exception:
+                pass
+        self.thumbnail_ready.emit(task.path, image, task.generation)
 
 
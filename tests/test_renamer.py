@@ -1,5 +1,10 @@
 from pathlib import Path
-from services.renamer import compute_number_width, generate_preview_mappings
+from services.renamer import (
+    compute_number_width,
+    generate_preview_mappings,
+    plan_rename_operations,
+    two_phase_rename,
+)
 
 
 def test_compute_number_width():
@@ -20,12 +25,45 @@ def test_generate_preview(tmp_path: Path):
 
     # 输入 files 前需按名称升序
     files.sort(key=lambda p: p.name)
-    rows = generate_preview_mappings(tmp_path, files, prefix="Trip_")
+    rows, has_conflict = generate_preview_mappings(tmp_path, files, prefix="Trip_")
 
     assert len(rows) == 3
-    assert rows[0].new_path.name.startswith("Trip_001")
-    assert rows[1].new_path.name.startswith("Trip_002")
-    assert rows[2].new_path.name.startswith("Trip_003")
-    assert all(r.status == "OK" for r in rows)
+    assert rows[0][1].name.startswith("Trip_001")
+    assert rows[1][1].name.startswith("Trip_002")
+    assert rows[2][1].name.startswith("Trip_003")
+    assert all(r[2] == "OK" for r in rows)
+    assert not has_conflict
 
 
+def test_plan_rename_operations(tmp_path: Path):
+    # 互换（环）+ 普通加前缀（无环）
+    a, b = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    c = tmp_path / "c.jpg"
+    mappings = [(a, b), (b, a), (c, tmp_path / "x_c.jpg")]
+    direct, cyclic = plan_rename_operations(mappings)
+    assert (c, tmp_path / "x_c.jpg") in direct
+    assert {m[0] for m in cyclic} == {a, b}
+
+
+def test_two_phase_rename_swap_and_direct(tmp_path: Path):
+    for name in ["a.jpg", "b.jpg", "c.jpg"]:
+        (tmp_path / name).write_bytes(b"x")
+    mappings = [
+        (tmp_path / "a.jpg", tmp_path / "b.jpg"),
+        (tmp_path / "b.jpg", tmp_path / "a.jpg"),
+        (tmp_path / "c.jpg", tmp_path / "d.jpg"),
+    ]
+    results = two_phase_rename(mappings)
+    assert all(r[2] for r in results)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.jpg", "b.jpg", "d.jpg"]
+
+
+def test_two_phase_rename_refuses_existing_target(tmp_path: Path):
+    # 目标名已被清单外的文件占用：必须失败且不得覆盖目标内容
+    (tmp_path / "a.jpg").write_bytes(b"A")
+    (tmp_path / "b.jpg").write_bytes(b"B")
+    results = two_phase_rename([(tmp_path / "a.jpg", tmp_path / "b.jpg")])
+    assert not results[0][2]
+    assert "目标已存在" in results[0][3]
+    assert (tmp_path / "b.jpg").read_bytes() == b"B"
+    assert (tmp_path / "a.jpg").exists()
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
 
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtGui import QIcon, QPixmap
-from PySide6.QtWidgets import QListWidget, QListWidgetItem
+from PySide6.QtCore import Qt, QModelIndex, QSize, QTimer, QAbstractListModel
+from PySide6.QtGui import QIcon, QImage, QPixmap
+from PySide6.QtWidgets import QListView
 
 from services.thumbnailer import ThumbnailerService
 
@@ -13,77 +14,175 @@ from services.thumbnailer import ThumbnailerService
 IMAGE_EXTS: Set[str] = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp"}
 
 
-class ImageGridView(QListWidget):
+def list_images(directory: Path) -> Tuple[List[Path], Set[str]]:
+    """枚举目录：返回 (按名升序的图片列表, 全部文件名小写集合)。
+
+    模块级函数，便于在工作线程（DirectoryScanner）中复用。
+    """
+    items: List[Path] = []
+    names_lower: Set[str] = set()
+    try:
+        # DirEntry.is_file() 复用枚举结果，不为每项额外 stat
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                name = entry.name
+                names_lower.add(name.lower())
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS:
+                    items.append(directory / name)
+    except Exception:
+        items = []
+        names_lower = set()
+    items.sort(key=lambda p: p.name)
+    return items, names_lower
+
+
+class _ImageListModel(QAbstractListModel):
+    """极简列表模型：数据就是一个 Path 列表 + 行号→图标映射。
+
+    整目录切换通过一次 begin/endResetModel 完成（单个信号），
+    缩略图就绪后按行发 dataChanged(DecorationRole)，
+    避免 QListWidget 逐条 addItem 触发的 O(N²) 重排。
+    """
+
+    def __init__(self, placeholder: QIcon, parent=None) -> None:
+        super().__init__(parent)
+        self._paths: List[Path] = []
+        self._icons: Dict[int, QIcon] = {}
+        self._placeholder = placeholder
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self._paths[row].name
+        if role == Qt.DecorationRole:
+            return self._icons.get(row, self._placeholder)
+        if role == Qt.UserRole:
+            # 直接返回 Path 对象：调用方无需再从字符串重建（省去规范化开销）
+            return self._paths[row]
+        return None
+
+    def set_paths(self, paths: List[Path]) -> None:
+        self.beginResetModel()
+        self._paths = list(paths)
+        self._icons.clear()
+        self.endResetModel()
+
+    def paths(self) -> List[Path]:
+        return self._paths
+
+    def set_placeholder(self, icon: QIcon) -> None:
+        self._placeholder = icon
+
+    def set_icon(self, row: int, icon: QIcon) -> None:
+        self._icons[row] = icon
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+
+class ImageGridView(QListView):
     def __init__(self, icon_size: QSize = QSize(128, 128), parent=None) -> None:
         super().__init__(parent)
-        self.setViewMode(QListWidget.IconMode)
-        self.setResizeMode(QListWidget.Adjust)
-        self.setMovement(QListWidget.Static)
+        self.setViewMode(QListView.IconMode)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
         self.setIconSize(icon_size)
-        self.setSelectionMode(QListWidget.SingleSelection)
+        self.setSelectionMode(QListView.SingleSelection)
         self.setSpacing(8)
+        # 所有项同尺寸（占位图标保证），让视图跳过逐项测量
+        self.setUniformItemSizes(True)
         # 为首批加载设置透明占位，避免叠影与布局抖动
         self._placeholder_icon = self._make_placeholder_icon(icon_size)
         self._update_grid_metrics(icon_size)
 
         self._current_dir: Path | None = None
-        self._path_to_item: Dict[Path, QListWidgetItem] = {}
+        self._existing_names_lower: Set[str] = set()
+        self._row_by_path: Dict[Path, int] = {}
+        self._model = _ImageListModel(self._placeholder_icon, self)
+        self.setModel(self._model)
         self._thumbnailer = ThumbnailerService()
         self._thumbnailer.thumbnail_ready.connect(self._on_thumbnail_ready)
+        # 合并缩略图刷新：就绪结果先入队，16ms 后一次性上图标，
+        # 避免大目录下每张图一次跨线程投递 + 一次视口失效；
+        # 工作线程只传 QImage，QPixmap 统一在 GUI 线程批量生成
+        self._pending_thumbs: List[Tuple[Path, QImage]] = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(16)
+        self._flush_timer.timeout.connect(self._flush_pending_thumbs)
+        # 滚动后把积压的解码任务按可视区距离重排，先解用户正在看的
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
 
     def set_icon_size(self, size: QSize) -> None:
         self.setIconSize(size)
         self._placeholder_icon = self._make_placeholder_icon(size)
+        self._model.set_placeholder(self._placeholder_icon)
         self._update_grid_metrics(size)
 
     def load_directory(self, directory: Path) -> None:
+        # 同步扫描入口；扫描已在别处完成时请直接用 show_files
+        files, names_lower = list_images(directory)
+        self.show_files(directory, files, names_lower)
+
+    def show_files(self, directory: Path, files: List[Path], names_lower: Set[str]) -> None:
         self._current_dir = directory
         self._thumbnailer.cancel_pending()
-        self.clear()
-        self._path_to_item.clear()
-
-        files = self._list_images(directory)
-        for p in files:
-            item = QListWidgetItem(QIcon(), p.name)
-            item.setData(Qt.UserRole, str(p))
-            # 占位空图标
-            item.setIcon(self._placeholder_icon)
-            self.addItem(item)
-            self._path_to_item[p] = item
-            self._thumbnailer.request_thumbnail(p, self.iconSize())
+        self._pending_thumbs.clear()
+        self._existing_names_lower = names_lower
+
+        # 整批一次模型重置：全程只发一个信号，视图只重排一次
+        self._model.set_paths(files)
+        self._row_by_path = {p: row for row, p in enumerate(files)}
+        for row, p in enumerate(files):
+            self._thumbnailer.request_thumbnail(p, self.iconSize(), row=row)
 
     def current_files(self) -> List[Path]:
-        result: List[Path] = []
-        for i in range(self.count()):
-            it = self.item(i)
-            p = Path(it.data(Qt.UserRole))
-            result.append(p)
-        return result
+        return list(self._model.paths())
 
     def pause_loading_for_rename(self) -> None:
         # 取消未开始或正在排队的任务，减少占用导致的重命名失败
         self._thumbnailer.cancel_pending()
 
-    def _list_images(self, directory: Path) -> List[Path]:
-        items = []
-        try:
-            for child in directory.iterdir():
-                if not child.is_file():
-                    continue
-                if child.suffix.lower() in IMAGE_EXTS:
-                    items.append(child)
-        except Exception:
-            items = []
-        items.sort(key=lambda p: p.name)
-        return items
-
-    def _on_thumbnail_ready(self, path: Path, pixmap: QPixmap, generation: int) -> None:
+    def existing_names_lower(self) -> Set[str]:
+        # 最近一次 load_directory 时目录内全部文件名（小写），供预览生成复用，
+        # 免去 generate_preview_mappings 再扫一遍目录
+        return self._existing_names_lower
+
+    def _on_scrolled(self, _value: int) -> None:
+        index = self.indexAt(self.viewport().rect().center())
+        visible_row = index.row()
+        if visible_row < 0:
+            return
+        self._thumbnailer.reprioritize(visible_row)
+
+    def _on_thumbnail_ready(self, path: Path, image: QImage, generation: int) -> None:
         # ThumbnailerService 已内部过滤 generation，无需额外判断
-        item = self._path_to_item.get(path)
-        if item is not None:
-            item.setIcon(QIcon(pixmap))
-            # 确保视图及时重算布局
-            self.viewport().update()
+        self._pending_thumbs.append((path, image))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush_pending_thumbs(self) -> None:
+        if not self._pending_thumbs:
+            return
+        pending, self._pending_thumbs = self._pending_thumbs, []
+        self.setUpdatesEnabled(False)
+        try:
+            for path, image in pending:
+                row = self._row_by_path.get(path)
+                if row is not None:
+                    # 工作线程已转为像素图内部格式，这里零转换
+                    pixmap = QPixmap.fromImage(image, Qt.NoFormatConversion)
+                    self._model.set_icon(row, QIcon(pixmap))
+        finally:
+            self.setUpdatesEnabled(True)
+        # 整批只触发一次视口重绘
+        self.viewport().update()
 
     def _make_placeholder_icon(self, size: QSize) -> QIcon:
         px = QPixmap(size)
@@ -97,5 +196,3 @@ class ImageGridView(QListWidget):
         w = max(64, icon_size.width() + 16)
         h = max(64, icon_size.height() + text_h + 12)
         self.setGridSize(QSize(w, h))
-
-